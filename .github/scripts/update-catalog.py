@@ -4,43 +4,88 @@ Update catalog after push to main (runs after validation passes):
 - For each changed template: bump manifest version (semver patch) if author didn't
 - Regenerate info.yaml from all manifests (using updated versions)
 """
+import atexit
+import datetime
+import functools
+import hashlib
+import json
 import os
 import re
+import subprocess
 import sys
 from pathlib import Path
 
+import yaml
+
 try:
-    import yaml
+    from yaml import CSafeDumper as SafeDumper, CSafeLoader as SafeLoader
 except ImportError:
-    import subprocess
-    subprocess.run([sys.executable, "-m", "pip", "install", "pyyaml"], check=True)
-    import yaml
-
+    from yaml import SafeDumper, SafeLoader
 
 REPO_ROOT = Path(__file__).resolve().parent.parent.parent
-SEMVER_PATTERN = re.compile(r"^(\d+)\.(\d+)\.(\d+)$")
+# Candidate `version: x.y.z` lines at indent 0 or 2 (optionally quoted / commented)
+MANIFEST_VERSION_LINE = re.compile(
+    rb"^((?:  )?version:[ \t]*['\"]?)(\d+\.\d+\.\d+)(['\"]?(?:[ \t]+#[^\r\n]*)?[ \t]*\r?)$", re.M
+)
+DIFF_FILE_HEADER = re.compile(r"^diff --git ", re.M)
+PLAIN_SCALAR_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.\-/ ]*")  # used with fullmatch
+# Code points json.dumps(ensure_ascii=False) leaves raw that YAML folds as line breaks
+# (U+0085/2028/2029) or rejects as non-printable (DEL, C1, U+FFFE/FFFF). Lone surrogates
+# can't come from a UTF-8 manifest and libyaml rejects them even escaped.
+YAML_UNSAFE_IN_JSON = re.compile("[\x7f-\x9f\u2028\u2029\ufffe\uffff]")
+_RESOLVER = yaml.resolver.Resolver()
+_REPRESENTER = yaml.representer.SafeRepresenter()
+
+INFO_PATH = REPO_ROOT / "info.yaml"
+# Ties the last generated info.yaml to the manifest blobs and script it was built from
+INFO_FINGERPRINT_PATH = REPO_ROOT / ".info.yaml.fingerprint"
+SCRIPT_RELPATH = Path(__file__).resolve().relative_to(REPO_ROOT).as_posix()
+MANIFEST_CACHE_PATH = REPO_ROOT / ".github" / "scripts" / ".manifest-cache.json"
+# info.yaml and cached entries are products of this script, so any edit to it invalidates them
+SCRIPT_DIGEST = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
+# HEAD~1 may not exist on first commit; probed once here instead of per git call
+_HAS_PARENT = subprocess.run(
+    ["git", "rev-parse", "--verify", "--quiet", "HEAD~1"],
+    cwd=REPO_ROOT,
+    stdout=subprocess.DEVNULL,
+    stderr=subprocess.DEVNULL,
+).returncode == 0
+
+# Populated once by _load_diff(): files (changed paths), hunks (template dir -> manifest diff)
+_GIT_DIFF_CACHE: dict = {}
+# Loaded lazily by _manifest_cache(); entries used this run are written back at exit
+_MANIFEST_CACHE: dict | None = None
+_MANIFEST_CACHE_USED: dict = {}
+
+
+@functools.lru_cache(maxsize=1)
+def _scan_template_dirs() -> tuple[Path, ...]:
+    # DirEntry.is_dir uses the d_type from readdir, so only the manifest check needs a stat
+    with os.scandir(REPO_ROOT) as it:
+        return tuple(
+            Path(e.path) for e in it
+            if e.is_dir(follow_symlinks=False)
+            and not e.name.startswith(".")
+            and os.path.exists(os.path.join(e.path, "manifest.yaml"))
+        )
 
 
 def get_template_dirs() -> list[Path]:
-    """Return paths to template directories (those containing manifest.yaml)."""
-    return [
-        d for d in REPO_ROOT.iterdir()
-        if d.is_dir() and not d.name.startswith(".") and (d / "manifest.yaml").exists()
-    ]
+    """Return paths to template directories (those containing manifest.yaml).
 
+    Scanned once per process; this script never creates or removes templates.
+    """
+    return list(_scan_template_dirs())
 
-def get_changed_template_dirs() -> set[str]:
-    """Return template dir names that have changes in the latest commit."""
-    import subprocess
-    # HEAD~1 may not exist on first commit
-    result = subprocess.run(
-        ["git", "rev-parse", "HEAD~1"],
-        capture_output=True,
-        cwd=REPO_ROOT,
-    )
-    if result.returncode != 0:
-        # First commit: treat all templates as changed
-        return {d.name for d in get_template_dirs()}
+
+def _load_diff() -> dict:
+    """Run the HEAD~1..HEAD diffs once and cache changed files plus per-template manifest hunks."""
+    if _GIT_DIFF_CACHE:
+        return _GIT_DIFF_CACHE
+    if not _HAS_PARENT:
+        _GIT_DIFF_CACHE.update(files=[], hunks={})
+        return _GIT_DIFF_CACHE
     result = subprocess.run(
         ["git", "diff", "--name-only", "HEAD~1", "HEAD"],
         capture_output=True,
@@ -49,14 +94,44 @@ def get_changed_template_dirs() -> set[str]:
         cwd=REPO_ROOT,
     )
     files = result.stdout.strip().splitlines() if result.stdout.strip() else []
-    template_dirs = [d.name for d in get_template_dirs()]
-    return {f.split("/")[0] for f in files if "/" in f and f.split("/")[0] in template_dirs}
+    manifest_paths = [f for f in files if f.count("/") == 1 and f.endswith("/manifest.yaml")]
+    hunks: dict[str, str] = {}
+    if manifest_paths:
+        result = subprocess.run(
+            ["git", "diff", "--unified=0", "HEAD~1", "HEAD", "--", *manifest_paths],
+            capture_output=True,
+            text=True,
+            cwd=REPO_ROOT,
+        )
+        if result.returncode == 0:
+            for chunk in DIFF_FILE_HEADER.split(result.stdout)[1:]:
+                # Chunk starts with "a/<dir>/manifest.yaml b/<dir>/manifest.yaml"
+                header, _, body = chunk.partition("\n")
+                path = header.rsplit(" b/", 1)[-1]
+                hunks[path.split("/", 1)[0]] = body
+    _GIT_DIFF_CACHE.update(files=files, hunks=hunks)
+    return _GIT_DIFF_CACHE
+
+
+def get_changed_template_dirs() -> set[str]:
+    """Return template dir names that have changes in the latest commit."""
+    if not _HAS_PARENT:
+        # First commit: treat all templates as changed
+        return {d.name for d in get_template_dirs()}
+    files = _load_diff()["files"]
+    template_set = {d.name for d in get_template_dirs()}
+    changed: set[str] = set()
+    for f in files:
+        parts = f.split("/", 1)
+        if len(parts) == 2 and parts[0] in template_set:
+            changed.add(parts[0])
+    return changed
 
 
 def get_manifest_version(path: Path) -> str | None:
     """Extract version from manifest.yaml."""
-    with open(path) as f:
-        data = yaml.safe_load(f)
+    with open(path, "rb") as f:
+        data = yaml.load(f, Loader=SafeLoader)
     # Handle both manifest: { version: ... } and top-level version
     manifest = data.get("manifest", data)
     version = manifest.get("version")
@@ -65,89 +140,331 @@ def get_manifest_version(path: Path) -> str | None:
 
 def version_was_bumped(template_dir: str) -> bool:
     """Check if the manifest version was changed in this commit."""
-    import subprocess
-    result = subprocess.run(["git", "rev-parse", "HEAD~1"], capture_output=True, cwd=REPO_ROOT)
-    if result.returncode != 0:
+    if not _HAS_PARENT:
         return False  # First commit: we'll bump
-    manifest_path = f"{template_dir}/manifest.yaml"
-    result = subprocess.run(
-        ["git", "diff", "HEAD~1", "HEAD", "--", manifest_path],
-        capture_output=True,
-        text=True,
-        cwd=REPO_ROOT,
-    )
-    if result.returncode != 0 or not result.stdout:
-        return False
     # Check if a version line was changed
-    return "version:" in result.stdout
+    return "version:" in _load_diff()["hunks"].get(template_dir, "")
 
 
 def bump_patch_version(version: str) -> str:
-    """Increment patch component of semver."""
-    m = SEMVER_PATTERN.match(version.strip())
-    if not m:
-        return version
-    major, minor, patch = int(m.group(1)), int(m.group(2)), int(m.group(3))
-    return f"{major}.{minor}.{patch + 1}"
+    """Increment patch component of semver; anything but plain x.y.z is returned unchanged."""
+    parts = version.strip().split(".")
+    if len(parts) == 3 and all(p.isdecimal() for p in parts):
+        return f"{int(parts[0])}.{int(parts[1])}.{int(parts[2]) + 1}"
+    return version
 
 
 def bump_manifest_version(template_dir: str) -> bool:
     """Bump version in manifest.yaml. Returns True if file was modified."""
     manifest_path = REPO_ROOT / template_dir / "manifest.yaml"
-    with open(manifest_path) as f:
-        data = yaml.safe_load(f)
-
+    raw = manifest_path.read_bytes()
+    data = yaml.load(raw, Loader=SafeLoader)
+    # Same lookup as get_manifest_version: manifest: { version: ... } or top-level version
     manifest = data.get("manifest", data)
     old_version = manifest.get("version", "0.0.0")
     new_version = bump_patch_version(str(old_version))
-    manifest["version"] = new_version
 
-    with open(manifest_path, "w") as f:
-        yaml.dump(data, f, default_flow_style=False, sort_keys=False, allow_unicode=True)
+    # Common case: rewrite just the version line, keeping comments and formatting intact.
+    # Other keys can also be called `version:` (e.g. runtime.version), so only accept a
+    # rewrite that actually moves the manifest's own version.
+    for m in MANIFEST_VERSION_LINE.finditer(raw):
+        if m.group(2).decode() != str(old_version):
+            continue
+        new_raw = raw[:m.start(2)] + new_version.encode() + raw[m.end(2):]
+        new_data = yaml.load(new_raw, Loader=SafeLoader)
+        if str(new_data.get("manifest", new_data).get("version")) == new_version:
+            write_if_changed(manifest_path, new_raw)
+            break
+    else:
+        manifest["version"] = new_version
+        with open(manifest_path, "w") as f:
+            yaml.dump(
+                data, f, Dumper=SafeDumper, default_flow_style=False, sort_keys=False, allow_unicode=True
+            )
 
     print(f"Bumped {template_dir} version: {old_version} -> {new_version}")
     return True
 
 
-def build_info_yaml() -> dict:
-    """Build info.yaml content from all manifests (for fast search)."""
+def read_committed_manifests(template_names: list[str]) -> dict[str, tuple[str, bytes]]:
+    """Read HEAD:<dir>/manifest.yaml blobs in one `git cat-file --batch` round-trip.
+
+    Returns {dir: (blob_oid, content)}; templates whose manifest is not committed at HEAD
+    are omitted from the result.
+    """
+    if not template_names:
+        return {}
+    request = "".join(f"HEAD:{name}/manifest.yaml\n" for name in template_names).encode()
+    # communicate() feeds stdin and drains stdout concurrently, so large batches can't deadlock
+    proc = subprocess.Popen(
+        ["git", "cat-file", "--batch=%(objectname) %(objectsize)"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        cwd=REPO_ROOT,
+    )
+    out, _ = proc.communicate(request)
+    if proc.returncode != 0:
+        return {}
+    blobs: dict[str, tuple[str, bytes]] = {}
+    pos = 0
+    for name in template_names:
+        eol = out.find(b"\n", pos)
+        if eol == -1:
+            break
+        header = out[pos:eol].split()
+        pos = eol + 1
+        if len(header) != 2 or header[1] == b"missing":
+            continue
+        size = int(header[1])
+        blobs[name] = (header[0].decode(), out[pos:pos + size])
+        pos += size + 1  # blob content is followed by a newline
+    return blobs
+
+
+def _manifest_cache() -> dict:
+    """Return {relpath: entry} parsed-manifest cache from a previous run (empty if unusable)."""
+    global _MANIFEST_CACHE
+    if _MANIFEST_CACHE is None:
+        _MANIFEST_CACHE = {}
+        try:
+            doc = json.loads(MANIFEST_CACHE_PATH.read_text(encoding="utf-8"))
+            if doc.get("version") == SCRIPT_DIGEST and isinstance(doc.get("manifests"), dict):
+                _MANIFEST_CACHE = doc["manifests"]
+        except (OSError, ValueError, AttributeError):
+            pass
+        atexit.register(_save_manifest_cache)
+    return _MANIFEST_CACHE
+
+
+def _save_manifest_cache() -> None:
+    """Persist cache entries used this run (dropping templates that no longer exist)."""
+    manifests = {}
+    for rel_path, cached in _MANIFEST_CACHE_USED.items():
+        # Skip entries JSON can't round-trip (e.g. dates) rather than caching them as strings
+        try:
+            json.dumps(cached)
+        except (TypeError, ValueError):
+            continue
+        manifests[rel_path] = cached
+    doc = {"version": SCRIPT_DIGEST, "manifests": manifests}
+    try:
+        MANIFEST_CACHE_PATH.write_text(json.dumps(doc), encoding="utf-8")
+    except OSError as e:
+        print(f"WARNING: could not write {MANIFEST_CACHE_PATH.name}: {e}", file=sys.stderr)
+
+
+def _template_entry(template_name: str, data: dict) -> dict:
+    manifest = data.get("manifest", data)
+    return {
+        "id": manifest.get("id", template_name),
+        "name": manifest.get("name"),
+        "description": manifest.get("description"),
+        "version": manifest.get("version"),
+        "tags": manifest.get("tags", []),
+    }
+
+
+def get_uncommitted_manifests(template_names: list[str]) -> set[str]:
+    """Return template dirs whose working-tree manifest.yaml differs from HEAD (staged or not)."""
+    if not template_names:
+        return set()
+    result = subprocess.run(
+        ["git", "diff", "--name-only", "HEAD", "--", *(f"{n}/manifest.yaml" for n in template_names)],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=REPO_ROOT,
+    )
+    return {f.split("/", 1)[0] for f in result.stdout.splitlines() if "/" in f}
+
+
+def build_info_yaml(dirty: set[str] | None = None) -> dict:
+    """Build info.yaml content from all manifests (for fast search).
+
+    Manifests that match HEAD are read via git; templates in `dirty` (every manifest that
+    differs from HEAD; detected via git when None) or not yet committed are read from the
+    working tree. Parsed entries are cached by blob OID (HEAD) or by mtime+size (working tree)
+    so unchanged manifests are not re-parsed across runs.
+    """
+    template_dirs = get_template_dirs()
+    if dirty is None:
+        dirty = get_uncommitted_manifests([d.name for d in template_dirs])
+    committed = read_committed_manifests([d.name for d in template_dirs if d.name not in dirty])
+    cache = _manifest_cache()
     templates = []
-    for template_dir in get_template_dirs():
-        manifest_path = template_dir / "manifest.yaml"
-        with open(manifest_path) as f:
-            data = yaml.safe_load(f)
-        manifest = data.get("manifest", data)
-        templates.append({
-            "id": manifest.get("id", template_dir.name),
-            "name": manifest.get("name"),
-            "description": manifest.get("description"),
-            "version": manifest.get("version"),
-            "tags": manifest.get("tags", []),
-        })
+    for template_dir in template_dirs:
+        rel_path = f"{template_dir.name}/manifest.yaml"
+        cached = cache.get(rel_path) or {}
+        if template_dir.name in committed:
+            oid, blob = committed[template_dir.name]
+            key = {"oid": oid}
+        else:
+            st = (template_dir / "manifest.yaml").stat()
+            key = {"mtime": st.st_mtime_ns, "size": st.st_size}
+            blob = None
+        if "entry" in cached and all(cached.get(k) == v for k, v in key.items()):
+            entry = cached["entry"]
+        else:
+            if blob is not None:
+                data = yaml.load(blob, Loader=SafeLoader)
+            else:
+                with open(template_dir / "manifest.yaml", "rb") as f:
+                    data = yaml.load(f, Loader=SafeLoader)
+            entry = _template_entry(template_dir.name, data)
+        _MANIFEST_CACHE_USED[rel_path] = {**key, "entry": entry}
+        templates.append(entry)
     return {"templates": templates}
 
 
+def _json_flow(value) -> str:
+    """json.dumps a str or list of str as YAML flow text (JSON strings are YAML double-quoted)."""
+    return YAML_UNSAFE_IN_JSON.sub(
+        lambda m: f"\\u{ord(m.group()):04x}", json.dumps(value, ensure_ascii=False)
+    )
+
+
+def _scalar(value) -> str:
+    """Render a scalar for info.yaml, keeping the YAML type yaml.dump would have given it.
+
+    Strings are plain when safe, else JSON-quoted; None/bool/int/float/date use PyYAML's own
+    representer text. Anything else raises TypeError rather than being coerced to a string.
+    """
+    if isinstance(value, str):
+        if (
+            PLAIN_SCALAR_PATTERN.fullmatch(value)
+            and not value.endswith(" ")
+            # Plain only if it still reads back as a string (not 1.0, true, null, ...)
+            and _RESOLVER.resolve(yaml.ScalarNode, value, (True, False)) == "tag:yaml.org,2002:str"
+        ):
+            return value
+        return _json_flow(value)
+    if value is None or isinstance(value, (bool, int, float, datetime.date)):
+        return _REPRESENTER.represent_data(value).value
+    raise TypeError(f"info.yaml cannot represent {type(value).__name__} value {value!r}")
+
+
+def emit_info_yaml(templates: list[dict]) -> str:
+    """Serialize the info.yaml template list (flat dicts of scalars and lists of scalars).
+
+    Lists of strings are written as JSON flow sequences: JSON is valid YAML, and json.dumps
+    runs in C. Mixed lists fall back to per-item _scalar.
+    """
+    lines = ["templates:"] if templates else ["templates: []"]
+    for template in templates:
+        prefix = "- "
+        for key, value in template.items():
+            if isinstance(value, (list, tuple)):
+                if all(isinstance(item, str) for item in value):
+                    flow = _json_flow(list(value))
+                else:
+                    flow = "[" + ", ".join(_scalar(item) for item in value) + "]"
+                lines.append(f"{prefix}{key}: {flow}")
+            else:
+                lines.append(f"{prefix}{key}: {_scalar(value)}")
+            prefix = "  "
+    return "\n".join(lines) + "\n"
+
+
+def write_if_changed(path: Path, new_bytes: bytes) -> bool:
+    """Atomically replace `path` with `new_bytes` unless its SHA-256 already matches.
+
+    An unchanged file is left untouched (same inode and mtime); a replaced file keeps its
+    permission bits. Returns True if written.
+    """
+    mode = None
+    if path.exists():
+        with open(path, "rb") as f:
+            if hashlib.file_digest(f, "sha256").digest() == hashlib.sha256(new_bytes).digest():
+                return False
+            mode = os.fstat(f.fileno()).st_mode & 0o777
+    # Dot-prefixed sibling temp file (gitignored): one write() for the payload, then an atomic
+    # rename over the target. Removed on any exit path, including KeyboardInterrupt.
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        tmp_path.write_bytes(new_bytes)
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return True
+
+
+def manifest_fingerprint(template_names: list[str], dirty: set[str]) -> str:
+    """Return sorted "<path> <blob oid>" lines for every manifest as it will be committed.
+
+    Clean manifests take their OID from HEAD; `dirty` or uncommitted ones are hashed from the
+    working tree. The script digest is appended so emitter changes force a rebuild.
+    """
+    oids: dict[str, str] = {}
+    committed = [f"{n}/manifest.yaml" for n in template_names if n not in dirty]
+    if committed:
+        result = subprocess.run(
+            ["git", "ls-tree", "HEAD", "--", *committed],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=REPO_ROOT,
+        )
+        for line in result.stdout.splitlines():
+            # "<mode> blob <oid>\t<path>"
+            meta, _, path = line.partition("\t")
+            oids[path] = meta.split()[-1]
+    pending = [f"{n}/manifest.yaml" for n in template_names if f"{n}/manifest.yaml" not in oids]
+    if pending:
+        result = subprocess.run(
+            ["git", "hash-object", "--", *pending],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=REPO_ROOT,
+        )
+        oids.update(zip(pending, result.stdout.split()))
+    entries = sorted(f"{path} {oid}" for path, oid in oids.items())
+    entries.append(f"{SCRIPT_RELPATH} sha256:{SCRIPT_DIGEST}")
+    return "\n".join(entries) + "\n"
+
+
+def _info_digest_line(info_bytes: bytes) -> str:
+    """Fingerprint line for the generated info.yaml itself (the output, not an input)."""
+    return f"info.yaml sha256:{hashlib.sha256(info_bytes).hexdigest()}\n"
+
+
 def main() -> int:
     os.chdir(REPO_ROOT)
 
     changed = get_changed_template_dirs()
-    modified = False
+    bumped: set[str] = set()
 
     # Semver: bump patch version for changed templates (skip if author already bumped)
     for template_dir in sorted(changed):
         if not version_was_bumped(template_dir):
             bump_manifest_version(template_dir)
-            modified = True
-
-    # Regenerate info.yaml from all manifests
-    info_content = build_info_yaml()
-    info_path = REPO_ROOT / "info.yaml"
-    existing = info_path.read_text() if info_path.exists() else ""
-    new_content = yaml.dump(info_content, default_flow_style=False, sort_keys=False, allow_unicode=True)
-    if existing != new_content:
-        info_path.write_text(new_content)
+            bumped.add(template_dir)
+
+    # Skip the rebuild only if info.yaml was last generated from exactly these inputs and is
+    # still byte-identical to what was generated (hand edits in any earlier commit, or in the
+    # working tree, force a rebuild). The fingerprint is committed with info.yaml, so a failed
+    # update job self-heals on the next push.
+    template_names = [d.name for d in get_template_dirs()]
+    dirty = bumped | get_uncommitted_manifests([n for n in template_names if n not in bumped])
+    fingerprint = manifest_fingerprint(template_names, dirty)
+    stored = INFO_FINGERPRINT_PATH.read_text() if INFO_FINGERPRINT_PATH.exists() else None
+    if INFO_PATH.exists() and stored == fingerprint + _info_digest_line(INFO_PATH.read_bytes()):
+        return 0
+
+    # Regenerate info.yaml from all manifests (bumped/edited ones are only on disk, not at HEAD)
+    info_content = build_info_yaml(dirty=dirty)
+    new_content = emit_info_yaml(info_content["templates"])
+    new_bytes = new_content.encode("utf-8")
+    # The emitter is hand-written: refuse to write anything that doesn't read back identically
+    if yaml.load(new_content, Loader=SafeLoader) != info_content:
+        raise RuntimeError("emit_info_yaml output does not round-trip; info.yaml not written")
+    if write_if_changed(INFO_PATH, new_bytes):
         print("Updated info.yaml")
-        modified = True
+    stored = fingerprint + _info_digest_line(new_bytes)
+    write_if_changed(INFO_FINGERPRINT_PATH, stored.encode("utf-8"))
 
     return 0
 
@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 """Validate catalog changes for environments.yaml schema v3 and provider-native infra presets."""
+import functools
 import os
 import re
 import sys
 import subprocess
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Any
 
@@ -31,12 +33,25 @@ INFRA_SLICE_KINDS: frozenset[str] = frozenset(
 )
 
 
+def load_yaml(yaml: Any, stream: Any) -> Any:
+    """safe_load equivalent that uses libyaml's CSafeLoader when PyYAML was built with it."""
+    return yaml.load(stream, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+
+@functools.lru_cache(maxsize=1)
+def _scan_template_dirs(repo_root: Path) -> tuple[str, ...]:
+    with os.scandir(repo_root) as it:
+        return tuple(
+            e.name
+            for e in it
+            if e.is_dir(follow_symlinks=False)
+            and not e.name.startswith(".")
+            and os.path.exists(os.path.join(e.path, "manifest.yaml"))
+        )
+
+
 def get_template_dirs(repo_root: Path) -> list[str]:
-    return [
-        d.name
-        for d in repo_root.iterdir()
-        if d.is_dir() and not d.name.startswith(".") and (d / "manifest.yaml").exists()
-    ]
+    return list(_scan_template_dirs(repo_root))
 
 
 def get_changed_files() -> list[str]:
@@ -58,6 +73,17 @@ def get_changed_files() -> list[str]:
     return result.stdout.strip().splitlines() if result.stdout.strip() else []
 
 
+def get_tracked_files() -> set[str]:
+    """Paths present at HEAD (one git call instead of a stat per changed file)."""
+    result = subprocess.run(
+        ["git", "ls-tree", "-r", "--name-only", "HEAD"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(result.stdout.splitlines())
+
+
 def normalize_preset_file_doc(doc: Any) -> dict[str, Any] | None:
     if not isinstance(doc, dict):
         return None
@@ -408,7 +434,7 @@ def validate_namespace_preset(
         return
 
     with open(preset_yaml_path, encoding="utf-8") as f:
-        raw_doc = yaml.safe_load(f) or {}
+        raw_doc = load_yaml(yaml, f) or {}
     preset_doc = normalize_preset_file_doc(raw_doc)
     if not isinstance(preset_doc, dict):
         errors.append(
@@ -446,7 +472,7 @@ def validate_orphan_infra_presets(template_path: Path, template_dir: str, errors
         return
     for preset_yaml_path in sorted(infra.rglob("preset.yaml")):
         with open(preset_yaml_path, encoding="utf-8") as f:
-            raw_doc = yaml.safe_load(f) or {}
+            raw_doc = load_yaml(yaml, f) or {}
         preset_doc = normalize_preset_file_doc(raw_doc)
         rel_display = f"{template_dir}/{preset_yaml_path.relative_to(template_path)}"
         if not isinstance(preset_doc, dict):
@@ -476,7 +502,7 @@ def validate_resources_yaml(template_path: Path, template_dir: str, errors: list
     except ImportError:
         return
     with open(path, encoding="utf-8") as f:
-        doc = yaml.safe_load(f) or {}
+        doc = load_yaml(yaml, f) or {}
     resources = doc.get("resources")
     prefix = f"{template_dir}/resources.yaml"
     if resources is None:
@@ -535,7 +561,7 @@ def validate_template_deploy_contract(repo_root: Path, template_dir: str) -> lis
         return errors
 
     with open(env_path, encoding="utf-8") as f:
-        env_doc = yaml.safe_load(f) or {}
+        env_doc = load_yaml(yaml, f) or {}
     if env_doc.get("schemaVersion") != ENVIRONMENTS_SCHEMA_VERSION:
         errors.append(
             f"{template_dir}/environments.yaml: schemaVersion must be {ENVIRONMENTS_SCHEMA_VERSION}"
@@ -629,6 +655,18 @@ def validate_template_deploy_contract(repo_root: Path, template_dir: str) -> lis
     return errors
 
 
+def _validate_one(repo_root: Path, rel_path: str) -> tuple[str, str | None]:
+    """Parse one YAML file; returns (rel_path, error message or None). Module-level so it pickles."""
+    import yaml
+
+    try:
+        with open(repo_root / rel_path) as f:
+            load_yaml(yaml, f)
+    except yaml.YAMLError as e:
+        return rel_path, f"{rel_path}: {e}"
+    return rel_path, None
+
+
 def validate_yaml_files(repo_root: Path, changed_files: list[str]) -> bool:
     """Validate that changed YAML files parse correctly."""
     try:
@@ -638,20 +676,25 @@ def validate_yaml_files(repo_root: Path, changed_files: list[str]) -> bool:
         return False
 
     yaml_files = [f for f in changed_files if f.endswith((".yaml", ".yml"))]
-    errors = []
-
-    for rel_path in yaml_files:
-        path = repo_root / rel_path
-        if not path.exists():
-            continue
-        try:
-            with open(path) as f:
-                yaml.safe_load(f)
-        except yaml.YAMLError as e:
-            errors.append(f"{rel_path}: {e}")
+    errors: list[tuple[str, str]] = []
+
+    if yaml_files:
+        # Skip files deleted in the diff
+        existing = get_tracked_files()
+        yaml_files = [f for f in yaml_files if f in existing]
+
+    if yaml_files:
+        # Pure-Python parsing is CPU-bound under the GIL; only libyaml benefits from threads
+        executor_cls = ThreadPoolExecutor if yaml.__with_libyaml__ else ProcessPoolExecutor
+        with executor_cls(max_workers=min(8, os.cpu_count() or 4, len(yaml_files))) as pool:
+            futures = [pool.submit(_validate_one, repo_root, rel_path) for rel_path in yaml_files]
+            for future in as_completed(futures):
+                rel_path, err = future.result()
+                if err is not None:
+                    errors.append((rel_path, err))
 
     if errors:
-        for err in errors:
+        for _, err in sorted(errors):
             print(f"ERROR: {err}", file=sys.stderr)
         return False
     return True